@@ -1,293 +1,810 @@
-from __future__ import annotations
-
-import os
-import json
-import shutil
-import traceback
-from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any, Dict, Optional
-
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
-from pydantic import BaseModel, Field
-
-# -------------------- YOUR EXISTING HELPERS --------------------
-# These come from your current project. Make sure they are importable.
-from os_detect import detect_os
-from git_repo import clone_and_checkout
-from venv_manager import setup, remove_venv
-from deps import install_dependencies
-from dep_convert import convert_json
-from cyclo import generate_sbom
-from trivy import scan_sbom_cyclonedx, scan_sbom_json, scan_sbom_table
-from compare_trivy_dep import compare
-from language_detector import detect_language, detect_dependency_manager
-
-
-# -------------------- FASTAPI APP --------------------
-app = FastAPI(title="SBOM Scanner API", version="1.0.0")
-
-JOBS: Dict[str, Dict[str, Any]] = {}
-BASE_DIR = Path(os.getcwd()).resolve()
-JOBS_DIR = BASE_DIR / "jobs"
-JOBS_DIR.mkdir(parents=True, exist_ok=True)
-
-
-class ScanRequest(BaseModel):
-    id: str = Field(..., description="Unique job ID for tracking.")
-    giturl: str = Field(
-        ..., description="Git repo URL with optional branch (e.g. https://github.com/user/repo.git@branch)"
-    )
-
-
-class ScanStatus(BaseModel):
-    id: str
-    status: str
-    started_at: Optional[str] = None
-    finished_at: Optional[str] = None
-    error: Optional[str] = None
-    report: Optional[Dict[str, Any]] = None
-
-
-# -------------------- UTILS --------------------
-class WorkDir:
-    """Context manager to temporarily chdir into a directory and restore afterward."""
-
-    def __init__(self, path: Path):
-        self.path = Path(path)
-        self._prev = Path.cwd()
-
-    def __enter__(self):
-        self.path.mkdir(parents=True, exist_ok=True)
-        os.chdir(self.path)
-        return self.path
-
-    def __exit__(self, exc_type, exc, tb):
-        os.chdir(self._prev)
-
-
-def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-
-# -------------------- CORE PIPELINE WRAPPER --------------------
-def run_scan_pipeline(repo_with_branch: str, job_dir: Path) -> Dict[str, Any]:
-    """
-    Wraps your CLI pipeline into a function that returns a JSON report.
-    All side-effect files are written inside job_dir to avoid collisions.
-    """
-    env_name = "sbom-env"
-    artifacts: Dict[str, Any] = {}
-
-    with WorkDir(job_dir):
-        # Step 1: Detect OS
-        system = detect_os()
-        artifacts["system"] = system
-
-        # Step 2: Clone repo
-        repo_path = Path(clone_and_checkout(repo_with_branch)).resolve()
-        artifacts["repo_path"] = str(repo_path)
-
-        # Step 3: Detect language and dependency manager
-        language = detect_language(str(repo_path))
-        manager = detect_dependency_manager(str(repo_path), language)
-        artifacts["language"] = language
-        artifacts["dependency_manager"] = manager
-
-        # Step 4 & 5: Python venv + install deps (only if Python)
-        venv_path: Optional[str] = None
-        if language == "Python":
-            venv_path = setup(env_name=env_name, project_path=str(repo_path))
-            install_dependencies(env_name, str(repo_path))
-            artifacts["venv_path"] = venv_path
-
-        # Step 6: Normalize dets.json → normalized_deps.json (optional)
-        if Path("dets.json").exists():
-            convert_json("dets.json", "normalized_deps.json")
-            artifacts["normalized_deps_path"] = str((job_dir / "normalized_deps.json").resolve())
-        else:
-            artifacts["normalized_deps_path"] = None
-
-        # Step 7: Generate SBOM if dep file exists
-        dep_file = None
-        for f in ["all-dep.txt", "a.txt"]:
-            if Path(f).exists():
-                dep_file = f
-                break
-
-        if dep_file:
-            generate_sbom(env_name, dep_file, "sbom.json")
-            artifacts["sbom_path"] = str((job_dir / "sbom.json").resolve())
-        else:
-            artifacts["sbom_path"] = None
-
-        # Step 8: Scan SBOM with Trivy
-        trivy_json: Optional[Dict[str, Any]] = None
-        trivy_cyclonedx: Optional[Dict[str, Any]] = None
-
-        if Path("sbom.json").exists():
-            scan_sbom_cyclonedx("sbom.json", "sbom_p.json")
-            scan_sbom_json("sbom.json", "trivy_report.json")
-            scan_sbom_table("sbom.json", "table_trivy.txt")
-
-            artifacts["trivy_table_path"] = str((job_dir / "table_trivy.txt").resolve())
-
-            # Load JSON outputs (best-effort)
-            try:
-                trivy_json = json.loads(Path("trivy_report.json").read_text("utf-8"))
-            except Exception:
-                trivy_json = None
-            try:
-                trivy_cyclonedx = json.loads(Path("sbom_p.json").read_text("utf-8"))
-            except Exception:
-                trivy_cyclonedx = None
-        else:
-            artifacts["trivy_table_path"] = None
-
-        # Step 9: Compare Trivy results with normalized_deps.json (optional)
-        compare_result: Optional[Any] = None
-        if Path("sbom_p.json").exists() and Path("normalized_deps.json").exists():
-            try:
-                # If your compare() returns data, capture it; if it writes files/prints, that's fine.
-                compare_result = compare("sbom_p.json", "normalized_deps.json")
-            except Exception as e:
-                compare_result = {"error": str(e)}
-
-        # Step 10: DO NOT remove venv automatically inside the API; caller can clean later.
-
-    # Aggregate final report
-    report: Dict[str, Any] = {
-        "repo": repo_with_branch,
-        "artifacts": artifacts,
-        "results": {
-            "trivy_report_json": trivy_json,
-            "trivy_cyclonedx_json": trivy_cyclonedx,
-            "compare_result": compare_result,
-        },
-        "generated_at": now_iso(),
-    }
-
-    # Persist report.json for GET retrieval
-    (job_dir / "report.json").write_text(json.dumps(report, indent=2), "utf-8")
-    return report
-
-
-# -------------------- BACKGROUND TASK --------------------
-
-def _process_job(job_id: str, giturl: str):
-    job_dir = JOBS_DIR / job_id
-    JOBS[job_id]["status"] = "running"
-    JOBS[job_id]["started_at"] = now_iso()
-
-    try:
-        report = run_scan_pipeline(giturl, job_dir)
-        JOBS[job_id]["status"] = "completed"
-        JOBS[job_id]["finished_at"] = now_iso()
-        JOBS[job_id]["report_path"] = str((job_dir / "report.json").resolve())
-        JOBS[job_id]["error"] = None
-    except Exception:
-        JOBS[job_id]["status"] = "failed"
-        JOBS[job_id]["finished_at"] = now_iso()
-        err = traceback.format_exc()
-        JOBS[job_id]["error"] = err
-        (job_dir / "error.txt").write_text(err, "utf-8")
-
-
-# -------------------- ENDPOINTS --------------------
-@app.post("/api/scan_repo", response_model=ScanStatus)
-def scan_repo(req: ScanRequest, background: BackgroundTasks):
-    job_id = req.id
-
-    # Reject duplicate active IDs
-    if job_id in JOBS and JOBS[job_id]["status"] in {"pending", "running"}:
-        raise HTTPException(status_code=409, detail=f"Job '{job_id}' already exists and is {JOBS[job_id]['status']}")
-
-    # Initialize job record
-    JOBS[job_id] = {
-        "status": "pending",
-        "started_at": None,
-        "finished_at": None,
-        "error": None,
-        "report_path": None,
-    }
-
-    # Start background processing
-    background.add_task(_process_job, job_id, req.giturl)
-
-    return ScanStatus(id=job_id, status="pending", started_at=None, finished_at=None, error=None, report=None)
-
-
-@app.get("/api/getReport", response_model=ScanStatus)
-def get_report(ID: str = Query(..., description="Job ID")):
-    job_id = ID
-
-    if job_id not in JOBS:
-        # If API was restarted, try loading existing report from disk
-        job_dir = JOBS_DIR / job_id
-        report_path = job_dir / "report.json"
-        error_path = job_dir / "error.txt"
-        if report_path.exists():
-            report = json.loads(report_path.read_text("utf-8"))
-            return ScanStatus(
-                id=job_id,
-                status="completed",
-                started_at=None,
-                finished_at=None,
-                error=None,
-                report=report,
-            )
-        if error_path.exists():
-            return ScanStatus(
-                id=job_id,
-                status="failed",
-                started_at=None,
-                finished_at=None,
-                error=error_path.read_text("utf-8"),
-                report=None,
-            )
-        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
-
-    # If job exists in memory, include report if completed
-    record = JOBS[job_id]
-    report: Optional[Dict[str, Any]] = None
-    if record.get("report_path") and Path(record["report_path"]).exists():
-        try:
-            report = json.loads(Path(record["report_path"]).read_text("utf-8"))
-        except Exception:
-            report = None
-
-    return ScanStatus(
-        id=job_id,
-        status=record["status"],
-        started_at=record.get("started_at"),
-        finished_at=record.get("finished_at"),
-        error=record.get("error"),
-        report=report,
-    )
-
-
-# -------------------- OPTIONAL CLEANUP ENDPOINTS --------------------
-@app.delete("/api/job/{job_id}")
-def delete_job(job_id: str):
-    """Delete a job's files and in-memory record."""
-    job_dir = JOBS_DIR / job_id
-    if job_id in JOBS:
-        if JOBS[job_id]["status"] in {"running", "pending"}:
-            raise HTTPException(status_code=400, detail="Cannot delete a running job")
-        JOBS.pop(job_id, None)
-
-    if job_dir.exists():
-        shutil.rmtree(job_dir)
-    return {"ok": True}
-
-
-# -------------------- HOW TO RUN --------------------
-# 1) pip install fastapi uvicorn
-# 2) Make sure git and trivy are installed and available on PATH.
-# 3) uvicorn app:app --host 0.0.0.0 --port 5000 --reload
-# 4) Start a job:
-#    curl -X POST http://localhost:5000/api/scan_repo \
-#      -H 'Content-Type: application/json' \
-#      -d '{"id":"job123","giturl":"https://github.com/user/repo.git@branch"}'
-# 5) Poll for report:
-#    curl 'http://localhost:5000/api/getReport?ID=job123'
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+import shutil
+import subprocess
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import ijson
+import orjson
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+# -------------------- YOUR EXISTING HELPERS --------------------
+# The scan helpers are imported lazily inside run_scan_pipeline: only worker
+# processes ever run the pipeline, so the API process (and any worker that
+# never scans) skips their import cost entirely.
+import concurrency
+from job_store import get_job, upsert_job, remove_job, interrupt_active_jobs
+
+
+# -------------------- FASTAPI APP --------------------
+app = FastAPI(title="SBOM Scanner API", version="1.0.0")
+
+# JSON reports compress 5-20x; worth it for anything beyond tiny payloads
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# One cross-process cap on concurrent trivy invocations: trivy serializes on
+# its vuln-DB lock, so unbounded parallel scans just time out. Workers share
+# one DB download via TRIVY_CACHE_DIR (inherited through the environment).
+TRIVY_SEM = multiprocessing.BoundedSemaphore(int(os.getenv("TRIVY_CONCURRENCY", "2")))
+os.environ.setdefault("TRIVY_CACHE_DIR", str(Path(os.getcwd()).resolve() / ".cache" / "trivy"))
+
+# Cross-process versions of the concurrency module's caps: one bound on all
+# heavy external tools, and a lock so one worker populates the Trivy DB
+TOOLS_SEM = multiprocessing.BoundedSemaphore(
+    int(os.getenv("SBOM_MAX_CONCURRENCY", str(os.cpu_count() or 4))))
+TRIVY_DB_LOCK = multiprocessing.Lock()
+
+
+def _init_scan_worker(trivy_sem, tools_sem, trivy_db_lock):
+    """Executor initializer: swap in the cross-process concurrency caps."""
+    import trivy
+    trivy.TRIVY_SEM = trivy_sem
+    concurrency.TOOLS = tools_sem
+    concurrency.TRIVY_DB = trivy_db_lock
+
+
+# Scans run in separate worker processes so CPU/IO-heavy pipelines
+# (clone + pip install + trivy) don't serialize behind the event loop.
+EXECUTOR = ProcessPoolExecutor(
+    max_workers=int(os.getenv("SBOM_WORKERS", "4")),
+    initializer=_init_scan_worker,
+    initargs=(TRIVY_SEM, TOOLS_SEM, TRIVY_DB_LOCK),
+)
+
+# In-memory handles to submitted futures; job state itself lives in the
+# SQLite job store (jobs.db, WAL mode) so it survives API restarts and is
+# visible across processes.
+JOBS: Dict[str, Any] = {}
+
+# Single-flight map: concurrent scans of the same giturl coalesce onto one
+# pipeline run, and followers share the leader's report when it lands.
+INFLIGHT: Dict[str, Any] = {}
+INFLIGHT_LOCK = threading.Lock()
+
+BASE_DIR = Path(os.getcwd()).resolve()
+JOBS_DIR = BASE_DIR / "jobs"
+JOBS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Completed reports, keyed by sha256(repo_url:commit_sha). A repeat scan of
+# the same commit within REPORT_CACHE_TTL seconds reuses the cached report
+# instead of re-running clone + install + trivy.
+REPORT_CACHE_DIR = BASE_DIR / "report_cache"
+REPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+REPORT_CACHE_TTL = int(os.getenv("SBOM_CACHE_TTL", str(24 * 3600)))
+
+# One long-lived venv per Python version, shared by all jobs: venv bootstrap
+# + pip install dominates Python-scan latency, so pay it once. A shared wheel
+# cache speeds up whatever still needs installing.
+VENV_CACHE_DIR = BASE_DIR / ".cache" / "venvs" / f"py{sys.version_info.major}.{sys.version_info.minor}"
+PIP_CACHE_DIR = BASE_DIR / ".cache" / "pip"
+PIP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("PIP_CACHE_DIR", str(PIP_CACHE_DIR))
+# uv (venv creation, pip compile/install) keeps its wheel cache here too, so
+# every worker process reuses the same downloads
+UV_CACHE_DIR = BASE_DIR / ".cache" / "uv"
+UV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+os.environ.setdefault("UV_CACHE_DIR", str(UV_CACHE_DIR))
+
+# SBOMs are a pure function of the resolved dependency file, so cache them
+# by content hash and skip cyclonedx-py entirely on unchanged deps.
+SBOM_CACHE_DIR = BASE_DIR / ".cache" / "sbom"
+SBOM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Language/manager detection keyed by commit SHA; persists across restarts
+DETECT_CACHE_DIR = BASE_DIR / ".cache" / "detect"
+DETECT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@app.on_event("startup")
+def _reconcile_jobs():
+    """Fail jobs orphaned by a previous incarnation; their workers are gone."""
+    interrupted = interrupt_active_jobs(now_iso())
+    if interrupted:
+        print(f"⚠️ Marked {interrupted} orphaned job(s) as failed after restart")
+
+
+@app.on_event("startup")
+def _warm_venv():
+    """Create the shared venv once so the first scan doesn't pay for it."""
+    from venv_manager import setup
+    VENV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        setup(env_name="sbom-env", project_path=str(VENV_CACHE_DIR))
+    except Exception as e:
+        print(f"⚠️ Could not pre-create shared venv: {e}")
+
+
+@app.on_event("startup")
+def _warm_trivy_db():
+    """Download the Trivy vuln DB in the background so scans don't race for it."""
+    def _download():
+        from trivy import download_db
+        try:
+            download_db()
+        except Exception as e:
+            print(f"⚠️ Could not pre-download Trivy DB: {e}")
+
+    threading.Thread(target=_download, daemon=True).start()
+
+
+@app.on_event("shutdown")
+def _shutdown_executor():
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+class ScanRequest(BaseModel):
+    id: str = Field(..., description="Unique job ID for tracking.")
+    giturl: str = Field(
+        ..., description="Git repo URL with optional branch (e.g. https://github.com/user/repo.git@branch)"
+    )
+    shallow: bool = Field(True, description="Clone only the branch tip (git clone --depth).")
+    depth: int = Field(1, description="History depth when shallow cloning.")
+
+
+class ScanStatus(BaseModel):
+    id: str
+    status: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    report: Optional[Dict[str, Any]] = None
+
+
+# -------------------- UTILS --------------------
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _resolve_commit(repo_path: Path) -> Optional[str]:
+    """Return the checked-out commit SHA, or None if git fails."""
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=str(repo_path), capture_output=True, text=True, check=True,
+        )
+        return proc.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _link_or_copy(src, dst) -> None:
+    """
+    Share a file across cache/job dirs by hardlink — an O(1) metadata op
+    instead of rewriting tens of MB — falling back to a copy when linking
+    isn't possible (cross-device, unsupported FS). Safe because artifacts
+    are never modified in place once written.
+    """
+    src, dst = Path(src), Path(dst)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
+def _report_cache_key(repo_with_branch: str, commit_sha: str) -> str:
+    repo_url = repo_with_branch.split("@")[0]
+    return hashlib.sha256(f"{repo_url}:{commit_sha}".encode("utf-8")).hexdigest()
+
+
+def _warm_shared_caches():
+    """
+    Idempotent warm-up of the shared venv and Trivy vuln DB; cheap no-ops
+    once populated. Runs concurrently with the clone, so a cold cache is
+    paid for during the network wait instead of after it.
+    """
+    from venv_manager import setup
+    from trivy import download_db
+    try:
+        VENV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        setup(env_name="sbom-env", project_path=str(VENV_CACHE_DIR))
+    except Exception as e:
+        print(f"⚠️ venv warm-up failed: {e}")
+    try:
+        download_db()
+    except Exception as e:
+        print(f"⚠️ Trivy DB warm-up failed: {e}")
+
+
+@lru_cache(maxsize=256)
+def _detect_cached(repo_path: str, head_sha: Optional[str]) -> tuple:
+    """
+    Memoized language/dependency-manager detection, keyed on the checked-out
+    commit: detection is a pure function of the tree at HEAD, so repeat scans
+    of the same commit skip the walk. Results also persist under
+    .cache/detect/<sha>.json so the cache survives restarts.
+    """
+    disk = DETECT_CACHE_DIR / f"{head_sha}.json" if head_sha else None
+    if disk is not None and disk.exists():
+        data = orjson.loads(disk.read_bytes())
+        return tuple(data["languages"]), data["manager"]
+
+    from language_detector import detect_project
+    languages, manager = detect_project(repo_path)
+    if disk is not None:
+        disk.write_bytes(orjson.dumps({"languages": list(languages), "manager": manager}))
+    return tuple(languages), manager
+
+
+# Dependency descriptors that fully determine the resolved SBOM; hashing
+# them lets a repeat scan skip resolution + SBOM generation entirely
+_DESCRIPTOR_FILES = ("requirements.txt", "poetry.lock", "uv.lock", "Pipfile.lock",
+                     "pyproject.toml", "go.mod", "go.sum", "pom.xml")
+
+
+def _fingerprint(repo_path: Path) -> Optional[str]:
+    """SHA-256 over whichever dependency descriptors exist in the repo root."""
+    h = hashlib.sha256()
+    found = False
+    for name in _DESCRIPTOR_FILES:
+        p = repo_path / name
+        if p.is_file():
+            h.update(name.encode("utf-8"))
+            h.update(p.read_bytes())
+            found = True
+    return h.hexdigest() if found else None
+
+
+def _run_python_flow(repo_path: Path, job_dir: Path, env_name: str) -> Dict[str, Any]:
+    """Python subflow: shared venv, dependency resolution, SBOM generation."""
+    from venv_manager import setup
+    from deps import install_dependencies
+    from dep_convert import convert_json
+    from cyclo import generate_sbom
+
+    flow: Dict[str, Any] = {}
+
+    # Unchanged descriptor files mean an unchanged SBOM: reuse the cached
+    # outputs and skip venv + resolver + cyclonedx entirely
+    fp = _fingerprint(repo_path)
+    fp_cache = SBOM_CACHE_DIR / f"src-{fp}" if fp else None
+    if fp_cache is not None and (fp_cache / "sbom.json").exists():
+        print(f"✔ Reusing SBOM for unchanged dependency descriptors ({fp[:12]})")
+        _link_or_copy(fp_cache / "sbom.json", job_dir / "sbom.json")
+        flow["sbom_path"] = str(job_dir / "sbom.json")
+        cached_norm = fp_cache / "normalized_deps.json"
+        if cached_norm.exists():
+            _link_or_copy(cached_norm, job_dir / "normalized_deps.json")
+            flow["normalized_deps_path"] = str(job_dir / "normalized_deps.json")
+        else:
+            flow["normalized_deps_path"] = None
+        return flow
+
+    VENV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    flow["venv_path"] = setup(env_name=env_name, project_path=str(VENV_CACHE_DIR))
+    # Resolver fanout (uv + pipgrip subprocesses) counts against the
+    # cross-process external-tool cap
+    with concurrency.TOOLS:
+        install_dependencies(env_name, str(repo_path), work_dir=str(job_dir),
+                             venv_dir=str(VENV_CACHE_DIR))
+
+    # Normalize dets.json → normalized_deps.json (optional)
+    dets_path = job_dir / "dets.json"
+    normalized_path = job_dir / "normalized_deps.json"
+    if dets_path.exists():
+        convert_json(str(dets_path), str(normalized_path))
+        flow["normalized_deps_path"] = str(normalized_path)
+    else:
+        flow["normalized_deps_path"] = None
+
+    # Generate SBOM if dep file exists
+    dep_file = None
+    for f in ["all-dep.txt", "a.txt"]:
+        if (job_dir / f).exists():
+            dep_file = f
+            break
+
+    sbom_path = job_dir / "sbom.json"
+    if dep_file:
+        # blake2b of the dep file contents keys the SBOM cache: identical
+        # resolved deps always produce the same SBOM
+        dep_key = hashlib.blake2b((job_dir / dep_file).read_bytes()).hexdigest()
+        cached_sbom = SBOM_CACHE_DIR / f"{dep_key}.json"
+        if cached_sbom.exists():
+            print(f"✔ Reusing cached SBOM for '{dep_file}'")
+            _link_or_copy(cached_sbom, sbom_path)
+        else:
+            with concurrency.TOOLS:
+                generate_sbom(env_name, str(job_dir / dep_file), str(sbom_path), base_dir=str(VENV_CACHE_DIR))
+            if sbom_path.exists():
+                _link_or_copy(sbom_path, cached_sbom)
+        flow["sbom_path"] = str(sbom_path)
+    else:
+        flow["sbom_path"] = None
+
+    # Populate the descriptor-keyed cache for the next scan of these deps
+    if fp_cache is not None and sbom_path.exists():
+        fp_cache.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(sbom_path, fp_cache / "sbom.json")
+        if normalized_path.exists():
+            _link_or_copy(normalized_path, fp_cache / "normalized_deps.json")
+
+    return flow
+
+
+# Per-language subflows; polyglot repos run each detected flow concurrently.
+# Each flow owns disjoint output filenames inside job_dir.
+LANGUAGE_FLOWS = {"Python": _run_python_flow}
+
+
+def _write_report(report_path: Path, report: Dict[str, Any]) -> None:
+    """
+    Canonical report writer: sorted keys make the bytes stable for a given
+    report (diff- and cache-friendly). Written to a tmp file and renamed into
+    place so concurrent readers never see partial JSON.
+    """
+    tmp = report_path.with_name(report_path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp, report_path)
+
+
+def summarize_trivy(path: Path, top_k: int = 25) -> Optional[Dict[str, Any]]:
+    """
+    Stream a Trivy JSON report with ijson and keep only severity counts and the
+    first top_k CVE IDs, so reports never get embedded wholesale in report.json.
+    """
+    if not path.exists():
+        return None
+    severities: Dict[str, int] = {}
+    top_vulns = []
+    try:
+        with path.open("rb") as f:
+            for vuln in ijson.items(f, "Results.item.Vulnerabilities.item"):
+                sev = (vuln.get("Severity") or "UNKNOWN").lower()
+                severities[sev] = severities.get(sev, 0) + 1
+                if len(top_vulns) < top_k:
+                    top_vulns.append(vuln.get("VulnerabilityID"))
+    except Exception:
+        return None
+    return {
+        "vulnerability_count": sum(severities.values()),
+        "severities": severities,
+        "top_vulnerabilities": top_vulns,
+    }
+
+
+def summarize_cyclonedx(path: Path) -> Optional[Dict[str, Any]]:
+    """Stream a CycloneDX SBOM and keep only component/vulnerability counts."""
+    if not path.exists():
+        return None
+    components = 0
+    vulnerabilities = 0
+    try:
+        with path.open("rb") as f:
+            for prefix, event, _ in ijson.parse(f):
+                if event == "start_map" and prefix == "components.item":
+                    components += 1
+                elif event == "start_map" and prefix == "vulnerabilities.item":
+                    vulnerabilities += 1
+    except Exception:
+        return None
+    return {"component_count": components, "vulnerability_count": vulnerabilities}
+
+
+# -------------------- CORE PIPELINE WRAPPER --------------------
+def run_scan_pipeline(repo_with_branch: str, job_dir: Path, shallow: bool = True, depth: int = 1) -> Dict[str, Any]:
+    """
+    Wraps your CLI pipeline into a function that returns a JSON report.
+    All side-effect files are written inside job_dir to avoid collisions;
+    everything uses absolute paths so concurrent jobs never race on the
+    process-wide cwd.
+    """
+    # Deferred imports: paid once per worker process, on its first scan.
+    from os_detect import detect_os
+    from git_repo import clone_and_checkout
+    from trivy import scan_sbom_async, convert_report_async
+    from compare_trivy_dep import compare
+    from pipeline_dag import Step, run_dag
+
+    env_name = "sbom-env"
+    artifacts: Dict[str, Any] = {}
+    job_dir = Path(job_dir).resolve()
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    # Step 1: Detect OS
+    system = detect_os()
+    artifacts["system"] = system
+
+    # Step 2: Clone repo, overlapping the network wait with warming the
+    # shared venv and Trivy DB (both no-ops once their caches exist)
+    warm = threading.Thread(target=_warm_shared_caches, daemon=True)
+    warm.start()
+    with concurrency.TOOLS:
+        repo_path = Path(clone_and_checkout(repo_with_branch, shallow=shallow, depth=depth,
+                                            dest_dir=str(job_dir))).resolve()
+    artifacts["repo_path"] = str(repo_path)
+
+    # Step 2b: Short-circuit if this exact commit was scanned recently
+    commit_sha = _resolve_commit(repo_path)
+    artifacts["commit_sha"] = commit_sha
+    cache_key = _report_cache_key(repo_with_branch, commit_sha) if commit_sha else None
+    if cache_key:
+        cached = REPORT_CACHE_DIR / cache_key / "report.json"
+        if cached.exists() and time.time() - cached.stat().st_mtime < REPORT_CACHE_TTL:
+            print(f"✔ Reusing cached report for commit {commit_sha}")
+            _link_or_copy(cached, job_dir / "report.json")
+            return orjson.loads(cached.read_bytes())
+
+    # Step 3: Detect languages and dependency manager (memoized per commit)
+    languages, manager = _detect_cached(str(repo_path), commit_sha)
+    artifacts["language"] = languages[0] if languages else "Unknown"
+    artifacts["languages"] = list(languages)
+    artifacts["dependency_manager"] = manager
+
+    # Steps 4-9 run as an explicit DAG: each language flow is independent,
+    # the Trivy fanout needs the SBOM, and compare needs the Trivy output.
+    # Independent steps run concurrently; dependents start as soon as their
+    # inputs are ready.
+    normalized_path = job_dir / "normalized_deps.json"
+    sbom_path = job_dir / "sbom.json"
+    sbom_p_path = job_dir / "sbom_p.json"
+
+    def _make_flow_step(lang, fn):
+        def run():
+            artifacts[lang.lower()] = fn(repo_path, job_dir, env_name)
+        return run
+
+    def _trivy_step():
+        if not sbom_path.exists():
+            artifacts["trivy_table_path"] = None
+            artifacts["trivy_report_path"] = None
+            artifacts["trivy_cyclonedx_path"] = None
+            return
+
+        # Vulnerability matching runs once (JSON report); the other formats
+        # are cheap `trivy convert` re-renders of it, awaited concurrently.
+        async def _scan_all():
+            trivy_json = str(job_dir / "trivy_report.json")
+            await scan_sbom_async(str(sbom_path), trivy_json, "json")
+            await asyncio.gather(
+                convert_report_async(trivy_json, str(sbom_p_path), "cyclonedx"),
+                convert_report_async(trivy_json, str(job_dir / "table_trivy.txt"), "table"),
+            )
+
+        asyncio.run(_scan_all())
+        artifacts["trivy_table_path"] = str(job_dir / "table_trivy.txt")
+        artifacts["trivy_report_path"] = str(job_dir / "trivy_report.json")
+        artifacts["trivy_cyclonedx_path"] = str(sbom_p_path)
+
+    def _compare_step():
+        if sbom_p_path.exists() and normalized_path.exists():
+            try:
+                # If your compare() returns data, capture it; if it writes files/prints, that's fine.
+                return compare(str(sbom_p_path), str(normalized_path),
+                               output_file=str(job_dir / "comparison.txt"))
+            except Exception as e:
+                return {"error": str(e)}
+        return None
+
+    steps = [Step(f"flow:{lang.lower()}", _make_flow_step(lang, LANGUAGE_FLOWS[lang]))
+             for lang in languages if lang in LANGUAGE_FLOWS]
+    flow_names = [s.name for s in steps]
+    steps.append(Step("trivy_scans", _trivy_step, depends_on=flow_names))
+    steps.append(Step("compare", _compare_step, depends_on=["trivy_scans"]))
+    warm.join()  # the flows rely on the warmed venv/Trivy DB
+    dag_results = run_dag(steps)
+    compare_result = dag_results["compare"]
+
+    # Summarize JSON outputs (best-effort); the raw reports stay on disk
+    trivy_json = summarize_trivy(job_dir / "trivy_report.json")
+    trivy_cyclonedx = summarize_cyclonedx(sbom_p_path)
+
+    # NOTE: the shared venv is never removed inside the API; caller can clean later.
+
+    # Aggregate final report
+    report: Dict[str, Any] = {
+        "repo": repo_with_branch,
+        "artifacts": artifacts,
+        "results": {
+            "trivy_report_summary": trivy_json,
+            "trivy_cyclonedx_summary": trivy_cyclonedx,
+            "compare_result": compare_result,
+        },
+        "generated_at": now_iso(),
+    }
+
+    # Persist report.json for GET retrieval
+    _write_report(job_dir / "report.json", report)
+
+    # Populate the commit-keyed cache for future scans of the same commit
+    if cache_key:
+        cache_dir = REPORT_CACHE_DIR / cache_key
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(job_dir / "report.json", cache_dir / "report.json")
+
+    return report
+
+
+# -------------------- WORKER TASK --------------------
+
+def _process_job(job_id: str, giturl: str, shallow: bool = True, depth: int = 1):
+    """Runs inside an EXECUTOR worker process; all state goes to the job store."""
+    job_dir = JOBS_DIR / job_id
+    record = {
+        "status": "running",
+        "started_at": now_iso(),
+        "finished_at": None,
+        "error": None,
+        "report_path": None,
+    }
+    upsert_job(job_id, record)
+
+    try:
+        report = run_scan_pipeline(giturl, job_dir, shallow=shallow, depth=depth)
+        record["status"] = "completed"
+        record["finished_at"] = now_iso()
+        record["report_path"] = str((job_dir / "report.json").resolve())
+        record["language"] = report["artifacts"].get("language")
+        record["dep_mgr"] = report["artifacts"].get("dependency_manager")
+    except Exception:
+        record["status"] = "failed"
+        record["finished_at"] = now_iso()
+        err = traceback.format_exc()
+        record["error"] = err
+        (job_dir / "error.txt").write_text(err, "utf-8")
+    upsert_job(job_id, record)
+
+
+@lru_cache(maxsize=32)
+def _load_report_cached(path_str: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse report.json once per (path, mtime) instead of once per poll."""
+    return orjson.loads(Path(path_str).read_bytes())
+
+
+def _adopt_leader_report(follower_id: str, leader_id: str, fut) -> None:
+    """Finish a piggybacked job by sharing the leader's report (hardlink when possible)."""
+    job_dir = JOBS_DIR / follower_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    record = {
+        "status": "failed",
+        "started_at": None,
+        "finished_at": now_iso(),
+        "error": None,
+        "report_path": None,
+    }
+    src = JOBS_DIR / leader_id / "report.json"
+    exc = fut.exception()
+    if exc is None and src.exists():
+        dst = job_dir / "report.json"
+        if not dst.exists():
+            _link_or_copy(src, dst)
+        record["status"] = "completed"
+        record["report_path"] = str(dst.resolve())
+    else:
+        record["error"] = (f"Coalesced with job '{leader_id}', which failed: {exc}"
+                           if exc else f"Coalesced with job '{leader_id}', which produced no report")
+    upsert_job(follower_id, record)
+
+
+# Raw artifacts stay on disk (report.json only carries summaries); serve
+# them via FileResponse so Starlette streams with sendfile instead of
+# materializing the file in Python.
+RAW_ARTIFACTS = {
+    "report": "report.json",
+    "sbom": "sbom.json",
+    "trivy_json": "trivy_report.json",
+    "trivy_cyclonedx": "sbom_p.json",
+    "trivy_table": "table_trivy.txt",
+    "normalized_deps": "normalized_deps.json",
+    "comparison": "comparison.txt",
+}
+
+
+# -------------------- ENDPOINTS --------------------
+@app.post("/api/scan_repo", response_model=ScanStatus)
+async def scan_repo(req: ScanRequest):
+    job_id = req.id
+    job_dir = JOBS_DIR / job_id
+
+    # Reject duplicate active IDs
+    existing = get_job(job_id)
+    if existing and existing.get("status") in {"pending", "running"}:
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' already exists and is {existing['status']}")
+
+    # Initialize job record before handing off to a worker
+    job_dir.mkdir(parents=True, exist_ok=True)
+    upsert_job(job_id, {"status": "pending"})
+
+    # Dispatch to the worker pool. Identical giturls coalesce: the first
+    # request becomes the leader, later ones piggyback on its result.
+    key = hashlib.sha256(req.giturl.encode("utf-8")).hexdigest()
+    loop = asyncio.get_running_loop()
+    with INFLIGHT_LOCK:
+        leader = INFLIGHT.get(key)
+        if leader is None:
+            fut = loop.run_in_executor(EXECUTOR, _process_job, job_id, req.giturl, req.shallow, req.depth)
+            INFLIGHT[key] = (job_id, fut)
+            fut.add_done_callback(lambda _f: INFLIGHT.pop(key, None))
+            JOBS[job_id] = fut
+        else:
+            leader_id, leader_fut = leader
+            leader_fut.add_done_callback(partial(_adopt_leader_report, job_id, leader_id))
+            JOBS[job_id] = leader_fut
+
+    return ScanStatus(id=job_id, status="pending", started_at=None, finished_at=None, error=None, report=None)
+
+
+@app.get("/api/getReport", response_model=ScanStatus)
+async def get_report(
+    ID: str = Query(..., description="Job ID"),
+    include: Optional[str] = Query(
+        None, description="Return a raw artifact instead of the status payload "
+                          f"(one of: {', '.join(RAW_ARTIFACTS)})"),
+):
+    job_id = ID
+    job_dir = JOBS_DIR / job_id
+
+    # Raw-artifact fast path: bytes go disk → socket via sendfile, no parsing
+    if include is not None:
+        if include not in RAW_ARTIFACTS:
+            raise HTTPException(status_code=400, detail=f"Unknown artifact kind '{include}'")
+        path = job_dir / RAW_ARTIFACTS[include]
+        if not path.exists():
+            raise HTTPException(status_code=404, detail=f"Artifact '{include}' not found for job '{job_id}'")
+        return FileResponse(path, media_type="application/json" if path.suffix == ".json" else "text/plain")
+
+    record = get_job(job_id)
+    if record is None:
+        # Jobs from before the job store existed: fall back to report/error files
+        report_path = job_dir / "report.json"
+        error_path = job_dir / "error.txt"
+        if report_path.exists():
+            report = orjson.loads(await asyncio.to_thread(report_path.read_bytes))
+            return ScanStatus(
+                id=job_id,
+                status="completed",
+                started_at=None,
+                finished_at=None,
+                error=None,
+                report=report,
+            )
+        if error_path.exists():
+            return ScanStatus(
+                id=job_id,
+                status="failed",
+                started_at=None,
+                finished_at=None,
+                error=await asyncio.to_thread(error_path.read_text, "utf-8"),
+                report=None,
+            )
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    # Include the report once the worker has written it
+    report: Optional[Dict[str, Any]] = None
+    if record.get("report_path") and Path(record["report_path"]).exists():
+        try:
+            report_file = Path(record["report_path"])
+            report = await asyncio.to_thread(
+                _load_report_cached, str(report_file), report_file.stat().st_mtime_ns
+            )
+        except Exception:
+            report = None
+
+    return ScanStatus(
+        id=job_id,
+        status=record["status"],
+        started_at=record.get("started_at"),
+        finished_at=record.get("finished_at"),
+        error=record.get("error"),
+        report=report,
+    )
+
+
+@app.get("/api/getReport/raw")
+async def get_report_raw(
+    ID: str = Query(..., description="Job ID"),
+    kind: str = Query("trivy_json", description=f"One of: {', '.join(RAW_ARTIFACTS)}"),
+):
+    if kind not in RAW_ARTIFACTS:
+        raise HTTPException(status_code=400, detail=f"Unknown artifact kind '{kind}'")
+    path = JOBS_DIR / ID / RAW_ARTIFACTS[kind]
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Artifact '{kind}' not found for job '{ID}'")
+    media_type = "application/json" if path.suffix == ".json" else "text/plain"
+    return FileResponse(path, media_type=media_type)
+
+
+async def _event_gen(job_id: str):
+    """Yield SSE lines on job status transitions instead of making clients poll."""
+    record = get_job(job_id)
+    if record is None:
+        yield b'data: {"status": "unknown"}\n\n'
+        return
+
+    yield b"data: " + orjson.dumps({"status": record["status"]}) + b"\n\n"
+
+    fut = JOBS.get(job_id)
+    if fut is not None and record.get("status") in {"pending", "running"}:
+        # Same process that submitted the job: just await its future
+        try:
+            await asyncio.shield(fut)
+        except Exception:
+            pass
+        record = get_job(job_id) or record
+    else:
+        # Submitted by another process/incarnation: fall back to store checks
+        while record.get("status") in {"pending", "running"}:
+            await asyncio.sleep(1)
+            record = get_job(job_id) or record
+
+    yield b"data: " + orjson.dumps({
+        "status": record.get("status"),
+        "report_path": record.get("report_path"),
+        "error": record.get("error"),
+    }) + b"\n\n"
+
+
+@app.get("/api/events")
+async def events(ID: str = Query(..., description="Job ID")):
+    """SSE stream emitting a line per job status transition."""
+    return StreamingResponse(_event_gen(ID), media_type="text/event-stream")
+
+
+@app.get("/api/pipeline/graph")
+async def pipeline_graph():
+    """Static shape of the scan DAG, with every registered language flow."""
+    flow_names = [f"flow:{lang.lower()}" for lang in LANGUAGE_FLOWS]
+    return {"steps": (
+        [{"name": name, "depends_on": []} for name in flow_names]
+        + [{"name": "trivy_scans", "depends_on": flow_names},
+           {"name": "compare", "depends_on": ["trivy_scans"]}]
+    )}
+
+
+@app.get("/api/artifact")
+async def artifact(ID: str = Query(..., description="Job ID"),
+                   name: str = Query(..., description="Artifact file name within the job dir")):
+    """Stream any file from a job directory (sendfile, range-request capable)."""
+    path = (JOBS_DIR / ID / name).resolve()
+    # Guard against path traversal out of the jobs tree
+    if not str(path).startswith(str(JOBS_DIR.resolve()) + os.sep):
+        raise HTTPException(status_code=400, detail="Invalid artifact path")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Artifact '{name}' not found for job '{ID}'")
+    media_type = "application/json" if path.suffix == ".json" else "text/plain"
+    return FileResponse(path, media_type=media_type)
+
+
+# -------------------- OPTIONAL CLEANUP ENDPOINTS --------------------
+@app.delete("/api/job/{job_id}")
+async def delete_job(job_id: str):
+    """Delete a job's files and job-store record."""
+    job_dir = JOBS_DIR / job_id
+    record = get_job(job_id)
+    if record and record.get("status") in {"running", "pending"}:
+        raise HTTPException(status_code=400, detail="Cannot delete a running job")
+    remove_job(job_id)
+    JOBS.pop(job_id, None)
+
+    if job_dir.exists():
+        await asyncio.to_thread(shutil.rmtree, job_dir)
+    return {"ok": True}
+
+
+# -------------------- HOW TO RUN --------------------
+# 1) pip install fastapi uvicorn ijson orjson
+# 2) Make sure git and trivy are installed and available on PATH.
+# 3) uvicorn app:app --host 0.0.0.0 --port 5000 --reload
+# 4) Start a job:
+#    curl -X POST http://localhost:5000/api/scan_repo \
+#      -H 'Content-Type: application/json' \
+#      -d '{"id":"job123","giturl":"https://github.com/user/repo.git@branch"}'
+# 5) Poll for report:
+#    curl 'http://localhost:5000/api/getReport?ID=job123'
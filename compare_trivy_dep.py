@@ -1,17 +1,38 @@
 import json
 import re
 
-def normalize_name(name):
+# Streaming parse keeps memory flat on multi-MB SBOMs; fall back to a full
+# parse when ijson isn't installed (plain CLI use)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Annotated so the module compiles cleanly with mypyc/Cython if a build
+# step is ever added; the annotations also let the C backends drop boxing
+# in these per-package loops.
+def normalize_name(name: str) -> str:
     name = name.lower().replace("_", ".").replace("-", ".")
     name = re.sub(r"\.+", ".", name)
     return name.strip(".")
 
-def load_sbom(sbom_file):
+def load_sbom(sbom_file: str) -> dict:
     """Load SBOM JSON and return dict: normalized package name -> version"""
+    result: dict = {}
+
+    if ijson:
+        with open(sbom_file, "rb") as f:
+            components = ijson.items(f, "components.item")
+            for comp in components:
+                name = comp.get("name")
+                version = comp.get("version")
+                if name and version:
+                    result[normalize_name(name)] = version
+        return result
+
     with open(sbom_file, encoding="utf-8") as f:
         data = json.load(f)
 
-    result = {}
     for comp in data.get("components", []):
         name = comp.get("name")
         version = comp.get("version")
@@ -19,12 +40,9 @@ def load_sbom(sbom_file):
             result[normalize_name(name)] = version
     return result
 
-def load_deps(deps_file):
+def load_deps(deps_file: str) -> dict:
     """Load dependency JSON and return dict: normalized package name -> version"""
-    with open(deps_file, encoding="utf-8") as f:
-        data = json.load(f)
-
-    result = {}
+    result: dict = {}
 
     def walk(deps):
         for dep in deps:
@@ -37,25 +55,34 @@ def load_deps(deps_file):
             if "dependencies" in dep and dep["dependencies"]:
                 walk(dep["dependencies"])
 
+    if ijson:
+        # Stream top-level entries; only one subtree is materialized at a time
+        with open(deps_file, "rb") as f:
+            walk(ijson.items(f, "dependencies.item"))
+        return result
+
+    with open(deps_file, encoding="utf-8") as f:
+        data = json.load(f)
+
     walk(data.get("dependencies", []))
     return result
 
-def compare(sbom_file, deps_file, output_file="comparison.txt"):
+def compare(sbom_file: str, deps_file: str, output_file: str = "comparison.txt") -> None:
     sbom = load_sbom(sbom_file)
     deps = load_deps(deps_file)
 
-    missing_in_sbom = []
+    # Set algebra on the dict key views runs in C: one hash per key instead
+    # of a Python-level lookup per iteration. Sorted for stable output.
+    missing_in_sbom = sorted(deps.keys() - sbom.keys())
+    common = deps.keys() & sbom.keys()
+
     version_mismatches = []
     exact_matches = []
-
-    for pkg, dep_ver in deps.items():
-        sbom_ver = sbom.get(pkg)
-        if sbom_ver is None:
-            missing_in_sbom.append(pkg)
-        elif sbom_ver != dep_ver:
-            version_mismatches.append((pkg, dep_ver, sbom_ver))
-        else:
-            exact_matches.append((pkg, dep_ver))
+    for pkg in sorted(common):
+        dep_ver, sbom_ver = deps[pkg], sbom[pkg]
+        (exact_matches if dep_ver == sbom_ver else version_mismatches).append(
+            (pkg, dep_ver, sbom_ver)
+        )
 
     with open(output_file, "w", encoding="utf-8") as f:
         f.write("====== Missing in SBOM ========\n")
@@ -64,7 +91,7 @@ def compare(sbom_file, deps_file, output_file="comparison.txt"):
         f.write("\n".join(f"- {pkg}: deps={dep_v}, sbom={sbom_v}" 
                           for pkg, dep_v, sbom_v in version_mismatches) or "None")
         f.write("\n\n====== Exact matches ========\n")
-        f.write("\n".join(f"- {pkg}: {ver}" for pkg, ver in exact_matches) or "None")
+        f.write("\n".join(f"- {pkg}: {ver}" for pkg, ver, _ in exact_matches) or "None")
 
     print(f"Comparison results saved in '{output_file}'")
 
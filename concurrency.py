@@ -0,0 +1,15 @@
+import os
+import threading
+
+# Caps on heavy external tools (git, uv, pipgrip, cyclonedx, trivy): each can
+# hold hundreds of MB of RSS, so unbounded fanout under many concurrent jobs
+# swaps the box. Defaults are per-process threading primitives so the CLI
+# works unchanged; the API rebinds both to multiprocessing equivalents in its
+# worker initializer so the caps span the whole worker pool.
+
+# General bound on concurrent external-tool subprocesses
+TOOLS = threading.BoundedSemaphore(int(os.getenv("SBOM_MAX_CONCURRENCY", str(os.cpu_count() or 4))))
+
+# Exactly one process populates the Trivy vuln DB on cold start; the rest
+# wait for it rather than racing the download
+TRIVY_DB = threading.Lock()
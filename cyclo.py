@@ -1,28 +1,36 @@
-import os
-import subprocess
-import platform
-
-def get_python_exec(env_name):
-    system = platform.system()
-    return os.path.join(
-        os.getcwd(),
-        env_name,
-        "Scripts" if system == "Windows" else "bin",
-        "python.exe" if system == "Windows" else "python"
-    )
-
-def generate_sbom(env_name, requirements_file, output_file):
-    python_exec = get_python_exec(env_name)
-
-    print("\n🔧 Installing cyclonedx-bom in virtual environment...")
-    subprocess.run([
-        "uv", "pip", "install", "cyclonedx-bom", "--python", python_exec
-    ], check=True)
-
-    print(f"\n📦 Generating SBOM from '{requirements_file}' → '{output_file}'...")
-    subprocess.run([
-        os.path.join(os.getcwd(), env_name, "Scripts" if platform.system() == "Windows" else "bin", "cyclonedx-py"),
-        "requirements", requirements_file, "-o", output_file
-    ], check=True)
-
-    print(f"\n✅ SBOM successfully saved to '{output_file}'")
+import os
+import subprocess
+import platform
+
+# Evaluated once at import; saves a uname() per call site
+_IS_WINDOWS = platform.system() == "Windows"
+
+def get_python_exec(env_name, base_dir=None):
+    return os.path.join(
+        base_dir or os.getcwd(),
+        env_name,
+        "Scripts" if _IS_WINDOWS else "bin",
+        "python.exe" if _IS_WINDOWS else "python"
+    )
+
+def generate_sbom(env_name, requirements_file, output_file, base_dir=None):
+    """
+    Generate a CycloneDX SBOM from requirements_file into output_file.
+    base_dir is where the env_name venv lives (default: cwd); all paths are
+    resolved explicitly so the process cwd is never relied upon.
+    """
+    base_dir = base_dir or os.getcwd()
+    python_exec = get_python_exec(env_name, base_dir)
+
+    print("\n🔧 Installing cyclonedx-bom in virtual environment...")
+    subprocess.run([
+        "uv", "pip", "install", "cyclonedx-bom", "--python", python_exec
+    ], check=True)
+
+    print(f"\n📦 Generating SBOM from '{requirements_file}' → '{output_file}'...")
+    subprocess.run([
+        os.path.join(base_dir, env_name, "Scripts" if _IS_WINDOWS else "bin", "cyclonedx-py"),
+        "requirements", requirements_file, "-o", output_file
+    ], check=True)
+
+    print(f"\n✅ SBOM successfully saved to '{output_file}'")
@@ -1,23 +1,35 @@
 import os
 import json
 
-def load_dependencies_from_json(file_path):
+def load_dependencies_from_json(file_path: str) -> dict:
     """Load dependencies directly from pipgrip's --tree-json-exact output."""
     if not os.path.exists(file_path):
         print(f"❌ Error: File '{file_path}' not found.")
         return {}
 
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        return json.loads(content)  # dict with "pkg==version": {deps...}
     except json.JSONDecodeError:
-        print(f"❌ Error: File '{file_path}' is not valid JSON.")
-        return {}
+        pass
+
+    # Tolerate tool log lines ahead of the JSON document: raw_decode takes a
+    # start index, so no O(N) slice copy of a multi-MB string is needed.
+    start = content.find("{")
+    if start != -1:
+        try:
+            data, _ = json.JSONDecoder().raw_decode(content, start)
+            return data
+        except json.JSONDecodeError:
+            pass
 
-    return data  # dict with "pkg==version": {deps...}
+    print(f"❌ Error: File '{file_path}' is not valid JSON.")
+    return {}
 
 
-def convert_json(json_input="dets.json", json_output="normalized_deps.json"):
+def convert_json(json_input: str = "dets.json", json_output: str = "normalized_deps.json") -> list:
     """
     Convert pipgrip JSON output (tree-json-exact) into normalized format:
     {
@@ -2,13 +2,32 @@ import os
 import subprocess
 import platform
 
-def install_dependencies(env_name, project_path):
-    system = platform.system()
-    env_path = os.path.join(os.getcwd(), env_name)
-    bin_dir = "Scripts" if system == "Windows" else "bin"
-    python_exec = os.path.join(env_path, bin_dir, "python.exe" if system == "Windows" else "python")
-    pip_exec = os.path.join(env_path, bin_dir, "pip.exe" if system == "Windows" else "pip")
-    pipgrip_exec = os.path.join(env_path, bin_dir, "pipgrip.exe" if system == "Windows" else "pipgrip")
+# Evaluated once at import; saves a uname() per call site
+_IS_WINDOWS = platform.system() == "Windows"
+
+def run_command_to_file(cmd, out_path, cwd=None):
+    """
+    Run cmd with stdout piped straight into out_path. The bytes go from the
+    kernel pipe buffer to disk without ever being held as a Python string,
+    so memory stays flat however large the tool's output is.
+    """
+    with open(out_path, "wb") as f:
+        subprocess.run(cmd, cwd=cwd, stdout=f, check=True)
+
+
+def install_dependencies(env_name, project_path, work_dir=None, venv_dir=None):
+    """
+    Resolve dependencies for project_path using the venv at venv_dir/env_name
+    (default: project_path/env_name, letting callers share one venv across
+    jobs). Output files (all-dep.txt, dets.json) land in work_dir (default:
+    cwd); the process cwd itself is never changed.
+    """
+    work_dir = os.path.abspath(work_dir or os.getcwd())
+    env_path = os.path.join(venv_dir or project_path, env_name)
+    bin_dir = "Scripts" if _IS_WINDOWS else "bin"
+    python_exec = os.path.join(env_path, bin_dir, "python.exe" if _IS_WINDOWS else "python")
+    pip_exec = os.path.join(env_path, bin_dir, "pip.exe" if _IS_WINDOWS else "pip")
+    pipgrip_exec = os.path.join(env_path, bin_dir, "pipgrip.exe" if _IS_WINDOWS else "pipgrip")
 
     # Install pipgrip
     print("\n🔧 Installing pipgrip inside the virtual environment...")
@@ -38,11 +57,14 @@ def install_dependencies(env_name, project_path):
         if "requirements.txt" in files:
             requirements_files.append(os.path.join(root, "requirements.txt"))
 
+    dep_txt = os.path.join(work_dir, "all-dep.txt")
+    dets_json = os.path.join(work_dir, "dets.json")
+
     # Process pyproject.toml
     if pyproject_files:
         for pyproject in pyproject_files:
-            subprocess.run(["uv", "pip", "compile", "--all-extras", pyproject, "-o", "all-dep.txt"], check=True)
-            subprocess.run(pipgrip_cmd + ["--tree-json-exact", "-r", "all-dep.txt"], stdout=open("dets.json", "w"), check=True)
+            subprocess.run(["uv", "pip", "compile", "--all-extras", pyproject, "-o", dep_txt], check=True)
+            run_command_to_file(pipgrip_cmd + ["--tree-json-exact", "-r", dep_txt], dets_json)
     # Process requirements.txt
     elif requirements_files:
         for req_file in requirements_files:
@@ -50,5 +72,5 @@ def install_dependencies(env_name, project_path):
                 lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
             if not lines:
                 continue
-            subprocess.run(["uv", "pip", "compile", req_file, "-o", "all-dep.txt"], check=True)
-            subprocess.run(pipgrip_cmd + ["--tree-json-exact", "-r", "all-dep.txt"], stdout=open("dets.json", "w"), check=True)
+            subprocess.run(["uv", "pip", "compile", req_file, "-o", dep_txt], check=True)
+            run_command_to_file(pipgrip_cmd + ["--tree-json-exact", "-r", dep_txt], dets_json)
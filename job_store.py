@@ -0,0 +1,68 @@
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Single SQLite file shared by the API process and the scan workers.
+# WAL mode allows concurrent readers while a worker writes.
+DB_PATH = Path(os.getcwd()).resolve() / "jobs.db"
+
+_FIELDS = ("status", "started_at", "finished_at", "error", "report_path", "language", "dep_mgr")
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_pid: Optional[int] = None
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Open the job store once per process (connections must not cross fork)."""
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        _conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT, started_at TEXT, finished_at TEXT, "
+            "error TEXT, report_path TEXT, language TEXT, dep_mgr TEXT)"
+        )
+        _conn_pid = os.getpid()
+    return _conn
+
+
+def upsert_job(job_id: str, record: Dict[str, Any]) -> None:
+    """Insert or replace a job record; missing fields are stored as NULL."""
+    _get_conn().execute(
+        "INSERT OR REPLACE INTO jobs (id, status, started_at, finished_at, error, report_path, language, dep_mgr) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [job_id] + [record.get(f) for f in _FIELDS],
+    )
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    row = _get_conn().execute(
+        "SELECT status, started_at, finished_at, error, report_path, language, dep_mgr "
+        "FROM jobs WHERE id = ?",
+        (job_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(_FIELDS, row))
+
+
+def remove_job(job_id: str) -> None:
+    _get_conn().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def interrupt_active_jobs(finished_at: str) -> int:
+    """
+    Mark jobs left pending/running by a dead process as failed. Called at API
+    startup: their worker futures did not survive the restart, so they will
+    never complete.
+    """
+    cur = _get_conn().execute(
+        "UPDATE jobs SET status = 'failed', finished_at = ?, "
+        "error = 'Interrupted by API restart' "
+        "WHERE status IN ('pending', 'running')",
+        (finished_at,),
+    )
+    return cur.rowcount
@@ -1,5 +1,6 @@
 import os
 import sys
+from collections import Counter
 
 # Use tomllib if Python >= 3.11
 if sys.version_info >= (3, 11):
@@ -7,85 +8,201 @@ if sys.version_info >= (3, 11):
 else:
     tomllib = None  # fallback if older Python
 
+# Inverted extension table: one dict lookup per file instead of a nested
+# per-language endswith scan. Currently supports: Python, Java, Go
+EXT_LANG = {".py": "Python", ".java": "Java", ".go": "Go"}
+
+# Directories that only hold vendored/generated files; walking them wastes
+# most of the traversal on large repos
+SKIP_DIRS = {".git", "node_modules", "venv", ".venv", "env", ".env",
+             "__pycache__", "vendor", "target", "build", "site-packages"}
+
+
+def _count_language_files(repo_path: str) -> Counter:
+    counts = Counter()
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        counts.update(
+            EXT_LANG[ext] for f in files
+            if (ext := os.path.splitext(f)[1]) in EXT_LANG
+        )
+    return counts
+
+
+# Manifest files in the repo root identify a language authoritatively —
+# a couple of stat calls instead of walking the whole tree
+_SENTINELS = {
+    "go.mod": "Go",
+    "pom.xml": "Java",
+    "build.gradle": "Java",
+    "build.gradle.kts": "Java",
+    "pyproject.toml": "Python",
+    "requirements.txt": "Python",
+    "Pipfile": "Python",
+    "setup.py": "Python",
+}
+
+
+def detect_languages(repo_path: str) -> list:
+    """
+    Detects all programming languages present in a repo, ordered by file
+    count (most files first). Root-level manifest files (go.mod, pom.xml,
+    pyproject.toml, ...) short-circuit the walk entirely.
+    Currently supports: Python, Java, Go
+    """
+    found = []
+    for name, lang in _SENTINELS.items():
+        if lang not in found and os.path.exists(os.path.join(repo_path, name)):
+            found.append(lang)
+    if found:
+        return found
+
+    counts = _count_language_files(repo_path)
+    return [lang for lang, count in sorted(counts.items(), key=lambda kv: -kv[1]) if count > 0]
+
+
 def detect_language(repo_path: str) -> str:
     """
     Detects the main programming language of a repo.
     Currently supports: Python, Java, Go
     """
-    extensions = {
-        "Python": [".py"],
-        "Java": [".java"],
-        "Go": [".go"]
-    }
-
-    counts = {lang: 0 for lang in extensions}
-    
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            for lang, exts in extensions.items():
-                if any(file.endswith(ext) for ext in exts):
-                    counts[lang] += 1
-
-    # Choose language with most files
-    language = max(counts, key=counts.get)
-    if counts[language] == 0:
-        return "Unknown"
-    return language
+    languages = detect_languages(repo_path)
+    return languages[0] if languages else "Unknown"
 
-def detect_dependency_manager(repo_path: str, language: str) -> str:
+def _pyproject_manager(pyproject_file: str) -> str:
+    """Resolve the manager from a pyproject.toml's [tool] table."""
+    if not tomllib:
+        return "pyproject"
+    try:
+        with open(pyproject_file, "rb") as f:
+            data = tomllib.load(f)
+        tool_keys = data.get("tool", {})
+        if "poetry" in tool_keys:
+            return "poetry"
+        elif "uv" in tool_keys:
+            return "uv"
+        elif "flit" in tool_keys:
+            return "flit"
+        else:
+            return "pyproject"
+    except Exception:
+        return "pyproject"
+
+
+# Files whose presence (anywhere in the tree) decides the dependency manager
+_MANAGER_FILES = {"poetry.lock", "uv.lock", "pipfile.lock", "requirements.txt",
+                  "pipfile", "setup.py", "pyproject.toml", "pom.xml",
+                  "build.gradle", "build.gradle.kts", "go.mod"}
+
+
+def detect_project(repo_path: str):
     """
-    Detects the dependency manager used based on language.
-    Recursively searches all subfolders for lock files first, then config files.
-    Uses tomllib for pyproject.toml if available.
+    Fused detection: one walk collects both extension counts and manager
+    file locations, so language and dependency manager come out of a single
+    traversal instead of two. Returns (languages, manager) where languages
+    is ordered like detect_languages().
     """
+    counts = Counter()
+    found = {}
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for f in files:
+            ext = os.path.splitext(f)[1]
+            if ext in EXT_LANG:
+                counts[EXT_LANG[ext]] += 1
+            low = f.lower()
+            if low in _MANAGER_FILES and low not in found:
+                found[low] = os.path.join(root, f)
+
+    languages = [lang for lang, count in counts.most_common() if count > 0]
+    if not languages:
+        # Manifests can identify a language even with no source files yet
+        for name, lang in _SENTINELS.items():
+            if name.lower() in found and lang not in languages:
+                languages.append(lang)
+    primary = languages[0] if languages else "Unknown"
+
     manager = "Unknown"
+    if primary == "Python":
+        # Lock files first, then config files — same ladder as
+        # detect_dependency_manager, resolved against the collected set
+        for name, mgr in [("poetry.lock", "poetry"), ("uv.lock", "uv"),
+                          ("pipfile.lock", "pipenv"), ("requirements.txt", "pip"),
+                          ("pipfile", "pipenv"), ("setup.py", "setuptools")]:
+            if name in found:
+                manager = mgr
+                break
+        else:
+            if "pyproject.toml" in found:
+                manager = _pyproject_manager(found["pyproject.toml"])
+    elif primary == "Java":
+        if "pom.xml" in found:
+            manager = "maven"
+        elif "build.gradle" in found or "build.gradle.kts" in found:
+            manager = "gradle"
+    elif primary == "Go":
+        if "go.mod" in found:
+            manager = "go modules"
+
+    return languages, manager
+
+
+def _files_lower(path: str):
+    """Lowercased names of the plain files directly inside path."""
+    with os.scandir(path) as it:
+        return {e.name.lower() for e in it if e.is_file()}
+
+
+# Python resolution ladder, lock files before config files; iterated in
+# order against a hashed set, one O(1) lookup per rung
+_PY_MANAGERS = (("poetry.lock", "poetry"), ("uv.lock", "uv"),
+                ("pipfile.lock", "pipenv"), ("requirements.txt", "pip"),
+                ("pipfile", "pipenv"), ("setup.py", "setuptools"))
 
+
+def _resolve_manager(language: str, files_lower, root: str):
+    """Resolve the manager for one directory listing; None if nothing matches."""
     if language == "Python":
-        for root, _, files in os.walk(repo_path):
-            files_lower = [f.lower() for f in files]
-
-            # Check lock files first
-            if "poetry.lock" in files_lower:
-                return "poetry"
-            elif "uv.lock" in files_lower:
-                return "uv"
-            elif "pipfile.lock" in files_lower:
-                return "pipenv"
-
-            # Check config files
-            if "requirements.txt" in files_lower:
-                return "pip"
-            elif "pipfile" in files_lower:
-                return "pipenv"
-            elif "setup.py" in files_lower:
-                return "setuptools"
-            elif "pyproject.toml" in files_lower and tomllib:
-                pyproject_file = os.path.join(root, "pyproject.toml")
-                try:
-                    with open(pyproject_file, "rb") as f:
-                        data = tomllib.load(f)
-                    tool_keys = data.get("tool", {})
-                    if "poetry" in tool_keys:
-                        return "poetry"
-                    elif "uv" in tool_keys:
-                        return "uv"
-                    elif "flit" in tool_keys:
-                        return "flit"
-                    else:
-                        return "pyproject"
-                except Exception:
-                    return "pyproject"
+        for name, mgr in _PY_MANAGERS:
+            if name in files_lower:
+                return mgr
+        if "pyproject.toml" in files_lower and tomllib:
+            return _pyproject_manager(os.path.join(root, "pyproject.toml"))
 
     elif language == "Java":
-        for root, _, files in os.walk(repo_path):
-            if "pom.xml" in files:
-                return "maven"
-            elif "build.gradle" in files:
-                return "gradle"
+        if "pom.xml" in files_lower:
+            return "maven"
+        elif "build.gradle" in files_lower:
+            return "gradle"
 
     elif language == "Go":
-        for root, _, files in os.walk(repo_path):
-            if "go.mod" in files:
-                return "go modules"
+        if "go.mod" in files_lower:
+            return "go modules"
+
+    return None
+
+
+def detect_dependency_manager(repo_path: str, language: str) -> str:
+    """
+    Detects the dependency manager used based on language. Manifests live at
+    the repo root in practice, so resolve against the root listing first — a
+    handful of stat calls instead of a full recursive walk. Only when the
+    root has no match does it fall back to a shallow walk (two levels deep,
+    skipping vendored dirs), which covers monorepo layouts without scanning
+    node_modules/vendor trees.
+    """
+    manager = _resolve_manager(language, _files_lower(repo_path), repo_path)
+    if manager:
+        return manager
+
+    base_depth = os.path.abspath(repo_path).rstrip(os.sep).count(os.sep)
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        if os.path.abspath(root).count(os.sep) - base_depth >= 2:
+            dirs[:] = []  # don't descend past depth 2
+        files_lower = frozenset(f.lower() for f in files)
+        manager = _resolve_manager(language, files_lower, root)
+        if manager:
+            return manager
 
-    return manager
+    return "Unknown"
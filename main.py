@@ -1,54 +1,70 @@
+import json
 import os
+import subprocess
+import threading
 from os_detect import detect_os
 from git_repo import clone_and_checkout
-from venv_manager import setup, remove_venv
-from deps import install_dependencies
-from dep_convert import convert_json
-from cyclo import generate_sbom, get_python_exec
-from trivy import scan_sbom_cyclonedx, scan_sbom_json, scan_sbom_table
-from compare_trivy_dep import compare
+from trivy import scan_sbom_all, download_db
 from language_detector import detect_language, detect_dependency_manager
 
-def main():
-    env_name = "sbom-env"
+# Flow-specific helpers (venv_manager, deps, dep_convert, cyclo,
+# compare_trivy_dep) are imported inside the step that uses them, so e.g. a
+# Go run never pays for the Python flow's import chain.
 
-    # Step 0: Ask for GitHub repo + branch
-    repo_with_branch = input(
-        "Enter the GitHub repo URL with branch (e.g. https://github.com/user/repo.git@branch): "
-    ).strip()
-    if not repo_with_branch:
-        print("❌ Repo URL required.")
-        return
+# Detection results keyed by commit SHA: same HEAD, same answer, no tree walk
+LANGDET_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "sbom-tool", "langdet.json")
 
-    # Step 1: Detect OS
-    system = detect_os()
 
-    # Step 2: Clone GitHub repo
-    repo_path = clone_and_checkout(repo_with_branch)
-    print(f"\n➡ Repo cloned at: {repo_path}")
+def detect_project_cached(repo_path):
+    """detect_language + detect_dependency_manager, memoized per HEAD commit."""
+    sha = None
+    try:
+        sha = subprocess.run(["git", "-C", repo_path, "rev-parse", "HEAD"],
+                             capture_output=True, text=True, check=True).stdout.strip() or None
+    except Exception:
+        pass
+
+    cache = {}
+    if sha and os.path.exists(LANGDET_CACHE):
+        try:
+            with open(LANGDET_CACHE, encoding="utf-8") as f:
+                cache = json.load(f)
+        except Exception:
+            cache = {}
+        hit = cache.get(sha)
+        if hit:
+            return hit["language"], hit["manager"]
 
-    # Step 3: Detect language and dependency manager
     language = detect_language(repo_path)
     manager = detect_dependency_manager(repo_path, language)
-    print(f"📌 Detected language: {language}")
-    print(f"📌 Detected dependency manager: {manager}")
 
-    # Step 4: Create virtual environment only if Python
-    venv_path = None
-    if language == "Python":
-        venv_path = setup(env_name=env_name, project_path=repo_path)
-        print(f"\n➡ Virtual environment created at: {venv_path}")
+    if sha:
+        cache[sha] = {"language": language, "manager": manager}
+        os.makedirs(os.path.dirname(LANGDET_CACHE), exist_ok=True)
+        tmp = LANGDET_CACHE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, LANGDET_CACHE)  # atomic: concurrent runs never see partial JSON
+    return language, manager
+
+def run_python_flow(repo_path, env_name):
+    """Python flow: venv, dependency resolution, normalization, SBOM."""
+    from venv_manager import setup
+    from deps import install_dependencies
+
+    venv_path = setup(env_name=env_name, project_path=repo_path)
+    print(f"\n➡ Virtual environment created at: {venv_path}")
 
-        # Step 5: Install dependencies
-        install_dependencies(env_name, repo_path)
+    install_dependencies(env_name, repo_path)
 
-    # Step 6: Normalize dets.json → normalized_deps.json
+    # Normalize dets.json → normalized_deps.json
     if os.path.exists("dets.json"):
+        from dep_convert import convert_json
         convert_json("dets.json", "normalized_deps.json")
     else:
         print("⚠️ dets.json not found. Skipping normalization.")
 
-    # Step 7: Generate SBOM from dependency files
+    # Generate SBOM from dependency files
     dep_file = None
     for f in ["all-dep.txt", "a.txt"]:
         if os.path.exists(f):
@@ -56,29 +72,100 @@ def main():
             break
 
     if dep_file:
+        from cyclo import generate_sbom
         generate_sbom(env_name, dep_file, "sbom.json")
     else:
         print("⚠️ No dependency file found for SBOM generation.")
 
-    # Step 8: Scan SBOM with Trivy
-    if os.path.exists("sbom.json"):
-        scan_sbom_cyclonedx("sbom.json", "sbom_p.json")
-        scan_sbom_json("sbom.json", "trivy_report.json")
-        scan_sbom_table("sbom.json", "table_trivy.txt")
+    return venv_path
 
-        # Step 9: Compare Trivy results with normalized_deps.json
-        if os.path.exists("normalized_deps.json"):
-            compare("sbom_p.json", "normalized_deps.json")
 
-    # Step 10: Optionally remove venv
+# One dispatch table instead of per-language copies of main(). Each flow
+# imports its own helpers lazily, writes sbom.json/normalized_deps.json in
+# the cwd, and returns a venv path (or None) for later cleanup; the scan and
+# compare steps below are shared by every flow.
+FLOWS = {"Python": run_python_flow}
+
+
+def main():
+    env_name = "sbom-env"
+
+    # Step 0: Ask for GitHub repo + branch
+    repo_with_branch = input(
+        "Enter the GitHub repo URL with branch (e.g. https://github.com/user/repo.git@branch): "
+    ).strip()
+    if not repo_with_branch:
+        print("❌ Repo URL required.")
+        return
+
+    # Step 1: Detect OS
+    system = detect_os()
+
+    # Fetch the Trivy vuln DB while the clone runs: two independent network
+    # operations, so the slower one hides the other. Best-effort — a failed
+    # warm-up just means the first scan downloads the DB itself.
+    def _warm_db():
+        try:
+            download_db()
+        except Exception as e:
+            print(f"⚠️ Trivy DB warm-up failed: {e}")
+
+    warm = threading.Thread(target=_warm_db, daemon=True)
+    warm.start()
+
+    # Step 2: Clone GitHub repo and work from inside it (CLI is single-process,
+    # so chdir here is safe; the helpers themselves no longer change cwd).
+    # The clone is shallow + blobless by default — dependency tooling only
+    # needs the manifest files at the branch tip. GIT_SHALLOW=0 forces a
+    # full-history clone.
+    repo_path = clone_and_checkout(repo_with_branch,
+                                   shallow=os.environ.get("GIT_SHALLOW", "1") != "0")
+    os.chdir(repo_path)
+    print(f"\n➡ Repo cloned at: {repo_path}")
+
+    # Step 3: Detect language and dependency manager (cached per HEAD commit)
+    language, manager = detect_project_cached(repo_path)
+    print(f"📌 Detected language: {language}")
+    print(f"📌 Detected dependency manager: {manager}")
+
+    # Steps 4-7: Run the language flow from the dispatch table
+    venv_path = None
+    flow = FLOWS.get(language)
+    if flow:
+        venv_path = flow(repo_path, env_name)
+    else:
+        print(f"⚠️ No flow registered for language '{language}'. Skipping SBOM generation.")
+
+    # Step 8a: The venv is only needed up to SBOM generation — ask about
+    # removal now and run the (slow) recursive delete on a thread, so the
+    # filesystem churn overlaps with the Trivy scans below
+    rm_thread = None
     if venv_path:
         remove = input(
             f"\nDo you want to remove the virtual environment '{venv_path}'? (y/n): "
         ).strip().lower()
         if remove == "y":
-            remove_venv(venv_path)
+            from venv_manager import remove_venv
+            rm_thread = threading.Thread(target=remove_venv, args=(venv_path,))
+            rm_thread.start()
         else:
             print(f"ℹ Virtual environment '{venv_path}' retained.")
 
+    # Step 8: Scan SBOM with Trivy (all three formats in parallel)
+    if os.path.exists("sbom.json"):
+        warm.join()  # the scan needs the warmed vuln DB
+        scan_sbom_all("sbom.json", {"cyclonedx": "sbom_p.json",
+                                    "json": "trivy_report.json",
+                                    "table": "table_trivy.txt"})
+
+        # Step 9: Compare Trivy results with normalized_deps.json
+        if os.path.exists("normalized_deps.json"):
+            from compare_trivy_dep import compare
+            compare("sbom_p.json", "normalized_deps.json")
+
+    # Step 10: Wait for any background venv removal to finish
+    if rm_thread:
+        rm_thread.join()
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
-import platform
-
-def detect_os():
-    system = platform.system()
-    print(f"Detected system: {system}")
-    return system
+import platform
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def detect_os():
+    # The OS can't change mid-run; cache the uname() and print once
+    system = platform.system()
+    print(f"Detected system: {system}")
+    return system
@@ -0,0 +1,53 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Step:
+    """A named pipeline step: a callable plus the names of steps it needs."""
+
+    def __init__(self, name, fn, depends_on=()):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+
+
+def run_dag(steps, max_workers=4):
+    """
+    Execute steps with Kahn's algorithm: steps whose dependencies are all
+    satisfied run immediately (concurrently, on a thread pool), and each
+    completion unlocks its successors. Returns {step_name: result}.
+    Raises ValueError on unknown/duplicate names or a dependency cycle, and
+    propagates the first step exception.
+    """
+    by_name = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step name '{step.name}'")
+        by_name[step.name] = step
+
+    in_degree = {}
+    successors = {step.name: [] for step in steps}
+    for step in steps:
+        in_degree[step.name] = len(step.depends_on)
+        for dep in step.depends_on:
+            if dep not in by_name:
+                raise ValueError(f"Step '{step.name}' depends on unknown step '{dep}'")
+            successors[dep].append(step.name)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as tp:
+        running = {tp.submit(by_name[name].fn): name
+                   for name, degree in in_degree.items() if degree == 0}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name] = fut.result()
+                for succ in successors[name]:
+                    in_degree[succ] -= 1
+                    if in_degree[succ] == 0:
+                        running[tp.submit(by_name[succ].fn)] = succ
+
+    if len(results) != len(steps):
+        unreached = sorted(set(by_name) - set(results))
+        raise ValueError(f"Pipeline DAG has a cycle; unreached steps: {unreached}")
+    return results
@@ -1,55 +1,189 @@
-import subprocess
-import os
-
-
-def scan_sbom_cyclonedx(sbom_input="sbom.json", cyclonedx_output="sbom_p.json"):
-    """Generate CycloneDX SBOM vulnerability report."""
-    if not os.path.exists(sbom_input):
-        print(f"❌ SBOM file '{sbom_input}' not found.")
-        return
-
-    print(f"\n🔍 Scanning SBOM for vulnerabilities (CycloneDX format)...")
-
-    subprocess.run([
-        "trivy", "sbom", sbom_input,
-        "--format", "cyclonedx",
-        "--scanners", "vuln",
-        "-o", cyclonedx_output
-    ], check=True)
-
-    print(f"✅ CycloneDX vulnerability report saved to '{cyclonedx_output}'")
-
-
-def scan_sbom_json(sbom_input="sbom.json", json_output="trivy_report.json"):
-    """Generate Trivy native JSON vulnerability report."""
-    if not os.path.exists(sbom_input):
-        print(f"❌ SBOM file '{sbom_input}' not found.")
-        return
-
-    print(f"\n🔍 Scanning SBOM for vulnerabilities (JSON format)...")
-
-    subprocess.run([
-        "trivy", "sbom", sbom_input,
-        "--format", "json",
-        "--scanners", "vuln",
-        "-o", json_output
-    ], check=True)
-
-    print(f"✅ JSON vulnerability report saved to '{json_output}'")
-
-def scan_sbom_table(sbom_input="sbom.json", table_output="table_trivy.txt"):
-    """Generate Trivy SBOM vulnerability report in table format."""
-    if not os.path.exists(sbom_input):
-        print(f"❌ SBOM file '{sbom_input}' not found.")
-        return
-
-    print(f"\n🔍 Scanning SBOM for vulnerabilities (Table format)...")
-
-    subprocess.run([
-        "trivy", "sbom", sbom_input,
-        "--format", "table",
-        "--scanners", "vuln",
-        "-o", table_output
-    ], check=True)
-
-    print(f"✅ Table vulnerability report saved to '{table_output}'")
+import asyncio
+import subprocess
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import concurrency
+
+# Bound on concurrent trivy processes: trivy serializes on its vuln-DB lock,
+# and too many parallel scans fail with "context deadline exceeded". The API
+# swaps this for a cross-process semaphore in its scan workers.
+TRIVY_SEM = threading.BoundedSemaphore(int(os.getenv("TRIVY_CONCURRENCY", "2")))
+
+
+def _cache_dir():
+    """Persistent vuln-DB cache shared by every invocation (and every job)."""
+    return os.environ.get(
+        "TRIVY_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "trivy"),
+    )
+
+
+def _sbom_cmd(fmt, sbom_input, output):
+    cmd = [
+        "trivy", "--cache-dir", _cache_dir(),
+        "sbom", sbom_input,
+        "--format", fmt,
+        "--scanners", "vuln",
+        "-o", output
+    ]
+    # The JSON report is the source for `trivy convert`; without this flag it
+    # only records packages with findings, so converted cyclonedx output
+    # would silently drop every clean component
+    if fmt == "json":
+        cmd.append("--list-all-pkgs")
+    # Offline scan skips the per-component registry lookups (Maven Central
+    # etc.) that dominate large Java scans; the local vuln DB is enough.
+    # Set SBOM_TRIVY_OFFLINE=0 to re-enable network enrichment.
+    if os.environ.get("SBOM_TRIVY_OFFLINE", "1") != "0":
+        cmd.append("--offline-scan")
+    # The warm-up path (download_db) owns DB freshness: once a DB exists in
+    # the shared cache, scans skip the update check instead of each paying a
+    # network round-trip (or a full ~80 MB download) to refresh it.
+    if os.path.exists(os.path.join(_cache_dir(), "db", "trivy.db")):
+        cmd.append("--skip-db-update")
+    return cmd
+
+
+def _convert_cmd(fmt, trivy_json, output):
+    # Re-renders an existing JSON report; pure formatting, no vuln-DB work
+    return [
+        "trivy", "--cache-dir", _cache_dir(),
+        "convert",
+        "--format", fmt,
+        "-o", output,
+        trivy_json
+    ]
+
+
+def _run_trivy(args):
+    """Run a trivy command under the concurrency semaphore."""
+    with TRIVY_SEM:
+        subprocess.run(args, check=True)
+
+
+def convert_report(trivy_json, output, fmt="cyclonedx"):
+    """Render an existing trivy JSON report into another format."""
+    # Conversion never touches the vuln DB, so it skips TRIVY_SEM
+    subprocess.run(_convert_cmd(fmt, trivy_json, output), check=True)
+
+
+async def convert_report_async(trivy_json, output, fmt="cyclonedx"):
+    """Async variant of convert_report for use inside an event loop."""
+    proc = await asyncio.create_subprocess_exec(*_convert_cmd(fmt, trivy_json, output))
+    rc = await proc.wait()
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, "trivy convert")
+
+
+async def scan_sbom_async(sbom_input, output, fmt="json"):
+    """
+    Async variant of the scan_sbom_* helpers: awaits the trivy subprocess on
+    the event loop instead of blocking a thread, so one loop can drive all
+    formats concurrently. Honors the same concurrency semaphore.
+    """
+    if not os.path.exists(sbom_input):
+        print(f"❌ SBOM file '{sbom_input}' not found.")
+        return
+
+    print(f"\n🔍 Scanning SBOM for vulnerabilities ({fmt} format)...")
+    await asyncio.to_thread(TRIVY_SEM.acquire)
+    try:
+        proc = await asyncio.create_subprocess_exec(*_sbom_cmd(fmt, sbom_input, output))
+        rc = await proc.wait()
+        if rc != 0:
+            raise subprocess.CalledProcessError(rc, "trivy")
+    finally:
+        TRIVY_SEM.release()
+    print(f"✅ {fmt} vulnerability report saved to '{output}'")
+
+
+def scan_sbom_all(sbom_input="sbom.json", outputs=None):
+    """
+    One vulnerability scan, every requested format: trivy matches against the
+    vuln DB exactly once (into the JSON report), then `trivy convert`
+    re-renders that report into the other formats concurrently. Conversion is
+    pure formatting, so the DB cost drops from N scans to one.
+    Returns {fmt: output_path} for the outputs that succeeded.
+    """
+    if not os.path.exists(sbom_input):
+        print(f"❌ SBOM file '{sbom_input}' not found.")
+        return {}
+
+    outputs = outputs or {"cyclonedx": "sbom_p.json", "json": "trivy_report.json",
+                          "table": "table_trivy.txt"}
+    done = {}
+
+    # The JSON report is the conversion source even if the caller didn't ask for it
+    trivy_json = outputs.get("json", f"{sbom_input}.trivy.json")
+    print(f"\n🔍 Scanning SBOM for vulnerabilities ({', '.join(outputs)} formats)...")
+    try:
+        _run_trivy(_sbom_cmd("json", sbom_input, trivy_json))
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Trivy scan failed: {e}")
+        return {}
+    if "json" in outputs:
+        done["json"] = trivy_json
+        print(f"✅ json vulnerability report saved to '{trivy_json}'")
+
+    rest = {fmt: out for fmt, out in outputs.items() if fmt != "json"}
+    if rest:
+        with ThreadPoolExecutor(max_workers=len(rest)) as ex:
+            futs = {ex.submit(convert_report, trivy_json, out, fmt): fmt
+                    for fmt, out in rest.items()}
+            for fut in as_completed(futs):
+                fmt = futs[fut]
+                try:
+                    fut.result()
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ {fmt} conversion failed: {e}")
+                else:
+                    done[fmt] = rest[fmt]
+                    print(f"✅ {fmt} vulnerability report saved to '{rest[fmt]}'")
+    return done
+
+
+def download_db():
+    """Pre-fetch the vulnerability DB so the first scan doesn't pay for it."""
+    # The DB lock keeps cold-start warm-ups from racing the same download
+    with concurrency.TRIVY_DB, TRIVY_SEM:
+        subprocess.run(["trivy", "--cache-dir", _cache_dir(), "image", "--download-db-only"], check=True)
+
+
+def scan_sbom_cyclonedx(sbom_input="sbom.json", cyclonedx_output="sbom_p.json"):
+    """Generate CycloneDX SBOM vulnerability report."""
+    if not os.path.exists(sbom_input):
+        print(f"❌ SBOM file '{sbom_input}' not found.")
+        return
+
+    print(f"\n🔍 Scanning SBOM for vulnerabilities (CycloneDX format)...")
+
+    _run_trivy(_sbom_cmd("cyclonedx", sbom_input, cyclonedx_output))
+
+    print(f"✅ CycloneDX vulnerability report saved to '{cyclonedx_output}'")
+
+
+def scan_sbom_json(sbom_input="sbom.json", json_output="trivy_report.json"):
+    """Generate Trivy native JSON vulnerability report."""
+    if not os.path.exists(sbom_input):
+        print(f"❌ SBOM file '{sbom_input}' not found.")
+        return
+
+    print(f"\n🔍 Scanning SBOM for vulnerabilities (JSON format)...")
+
+    _run_trivy(_sbom_cmd("json", sbom_input, json_output))
+
+    print(f"✅ JSON vulnerability report saved to '{json_output}'")
+
+def scan_sbom_table(sbom_input="sbom.json", table_output="table_trivy.txt"):
+    """Generate Trivy SBOM vulnerability report in table format."""
+    if not os.path.exists(sbom_input):
+        print(f"❌ SBOM file '{sbom_input}' not found.")
+        return
+
+    print(f"\n🔍 Scanning SBOM for vulnerabilities (Table format)...")
+
+    _run_trivy(_sbom_cmd("table", sbom_input, table_output))
+
+    print(f"✅ Table vulnerability report saved to '{table_output}'")
@@ -3,6 +3,9 @@ import subprocess
 import shutil
 import platform
 
+# Evaluated once at import; saves a uname() per call site
+_IS_WINDOWS = platform.system() == "Windows"
+
 def setup(env_name="sbom-env", project_path=None):
     """
     Create a virtual environment using uv.
@@ -25,11 +28,10 @@ def setup(env_name="sbom-env", project_path=None):
         print(f"\n✔ Virtual environment already exists at: {venv_path}")
 
     # Step 3: Find the Python executable inside the venv
-    system = platform.system()
     python_exec = os.path.join(
         venv_path,
-        "Scripts" if system == "Windows" else "bin",
-        "python.exe" if system == "Windows" else "python"
+        "Scripts" if _IS_WINDOWS else "bin",
+        "python.exe" if _IS_WINDOWS else "python"
     )
 
     print(f"\n✔ Virtual environment ready. Python executable: {python_exec}")
@@ -39,7 +41,14 @@ def setup(env_name="sbom-env", project_path=None):
 def remove_venv(venv_path):
     if os.path.exists(venv_path):
         print(f"\n🗑 Removing virtual environment at: {venv_path}")
-        shutil.rmtree(venv_path, ignore_errors=True)
+        # Rename first: the path vanishes instantly, so later code never
+        # trips over a half-deleted venv while the slow recursive unlink runs
+        doomed = f"{venv_path}.deleting-{os.getpid()}"
+        try:
+            os.rename(venv_path, doomed)
+        except OSError:
+            doomed = venv_path
+        shutil.rmtree(doomed, ignore_errors=True)
         print("✔ Virtual environment removed successfully.")
     else:
         print(f"\n⚠️ Virtual environment not found at: {venv_path}")